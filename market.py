@@ -153,33 +153,37 @@ def create_stocks(watch_remnants, offer_ids, warehouse_id)-> list:
         [{'offer_id': '00001', 'Model1': 10}, ...]
     """
     
+    remaining = set(offer_ids)
     stocks = list()
     date = str(datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z")
     for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append(
-                {
-                    "sku": str(watch.get("Код")),
-                    "warehouseId": warehouse_id,
-                    "items": [
-                        {
-                            "count": stock,
-                            "type": "FIT",
-                            "updatedAt": date,
-                        }
-                    ],
-                }
-            )
-            offer_ids.remove(str(watch.get("Код")))
+        code = str(watch.get("Код"))
+        if code not in remaining:
+            continue
+        count_raw = watch.get("Количество")
+        count = str(count_raw)
+        if count == ">10":
+            stock = 100
+        elif count == "1":
+            stock = 0
+        else:
+            stock = int(count_raw)
+        stocks.append(
+            {
+                "sku": code,
+                "warehouseId": warehouse_id,
+                "items": [
+                    {
+                        "count": stock,
+                        "type": "FIT",
+                        "updatedAt": date,
+                    }
+                ],
+            }
+        )
+        remaining.discard(code)
     # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
+    for offer_id in remaining:
         stocks.append(
             {
                 "sku": offer_id,
@@ -212,11 +216,13 @@ def create_prices(watch_remnants, offer_ids)-> list:
         dict prices
     """
 
+    offer_ids = set(offer_ids)
     prices = []
     for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
+        code = str(watch.get("Код"))
+        if code in offer_ids:
             price = {
-                "id": str(watch.get("Код")),
+                "id": code,
                 # "feed": {"id": 0},
                 "price": {
                     "value": int(price_conversion(watch.get("Цена"))),
@@ -248,7 +254,7 @@ async def upload_prices(watch_remnants, campaign_id, market_token)-> dict:
 
     offer_ids = get_offer_ids(campaign_id, market_token)
     prices = create_prices(watch_remnants, offer_ids)
-    for some_prices in list(divide(prices, 500)):
+    for some_prices in divide(prices, 500):
         update_price(some_prices, campaign_id, market_token)
     return prices
 
@@ -273,7 +279,7 @@ async def upload_stocks(watch_remnants, campaign_id, market_token, warehouse_id)
 
     offer_ids = get_offer_ids(campaign_id, market_token)
     stocks = create_stocks(watch_remnants, offer_ids, warehouse_id)
-    for some_stock in list(divide(stocks, 2000)):
+    for some_stock in divide(stocks, 2000):
         update_stocks(some_stock, campaign_id, market_token)
     not_empty = list(
         filter(lambda stock: (stock.get("items")[0].get("count") != 0), stocks)
@@ -289,13 +295,13 @@ def main():
     warehouse_fbs_id = env.str("WAREHOUSE_FBS_ID")
     warehouse_dbs_id = env.str("WAREHOUSE_DBS_ID")
 
-    watch_remnants = download_stock()
+    watch_remnants = download_stock().to_dict(orient="records")
     try:
         # FBS
         offer_ids = get_offer_ids(campaign_fbs_id, market_token)
         # Обновить остатки FBS
         stocks = create_stocks(watch_remnants, offer_ids, warehouse_fbs_id)
-        for some_stock in list(divide(stocks, 2000)):
+        for some_stock in divide(stocks, 2000):
             update_stocks(some_stock, campaign_fbs_id, market_token)
         # Поменять цены FBS
         upload_prices(watch_remnants, campaign_fbs_id, market_token)
@@ -304,7 +310,7 @@ def main():
         offer_ids = get_offer_ids(campaign_dbs_id, market_token)
         # Обновить остатки DBS
         stocks = create_stocks(watch_remnants, offer_ids, warehouse_dbs_id)
-        for some_stock in list(divide(stocks, 2000)):
+        for some_stock in divide(stocks, 2000):
             update_stocks(some_stock, campaign_dbs_id, market_token)
         # Поменять цены DBS
         upload_prices(watch_remnants, campaign_dbs_id, market_token)
@@ -1,36 +1,150 @@
+import asyncio
+import importlib.util
 import io
 import logging.config
-import os
+import random
 import re
+import weakref
 import zipfile
 from environs import Env
+from itertools import islice
+from typing import NamedTuple
 
+import aiohttp
+import numpy as np
+import orjson
 import pandas as pd
 import requests
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 logger = logging.getLogger(__file__)
 
+# Повторные попытки при ограничении частоты и сбоях сервера
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 0.5
+
+# Сессия только для скачивания остатков в download_stock (GET); запросы к OZON идут через aiohttp
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=RETRY_ATTEMPTS,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+        ),
+    ),
+)
+
+# Ограничение числа одновременных запросов к OZON и их частоты в секунду
+CONCURRENCY = 16
+RATE_LIMIT = 8
+# Загрузчиков вдвое больше слотов: пока одни ждут повтора, другие занимают слоты
+UPLOAD_WORKERS = 2 * CONCURRENCY
+# Семафор и лимитер привязываются к циклу событий, поэтому свои на каждый запуск
+_LIMITS = weakref.WeakKeyDictionary()
+
+_NON_DIGITS = re.compile("[^0-9]")
+
+PRODUCT_LIST_URL = "https://api-seller.ozon.ru/v2/product/list"
+PRICES_URL = "https://api-seller.ozon.ru/v1/product/import/prices"
+STOCKS_URL = "https://api-seller.ozon.ru/v1/product/import/stocks"
+CASIO_URL = "https://timeworld.ru/upload/files/ostatki.zip"
+
+# Быстрый движок calamine, если установлен python-calamine, иначе обычный xlrd
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "xlrd"
+
+# Максимум товаров в одном запросе по документации OZON
+PRICES_BATCH_SIZE = 1000
+STOCKS_BATCH_SIZE = 100
+
+
+def _get_limits()-> tuple:
+    """Get the semaphore and rate limiter of the running event loop
+    Returns:
+        tuple: asyncio.Semaphore and AsyncLimiter for requests to OZON
+
+    Examples:
+         >>> semaphore, limiter = _get_limits()
+    """
+
+    loop = asyncio.get_running_loop()
+    if loop not in _LIMITS:
+        _LIMITS[loop] = (
+            asyncio.Semaphore(CONCURRENCY),
+            AsyncLimiter(RATE_LIMIT, 1.0),
+        )
+    return _LIMITS[loop]
+
+
+async def _post(session, url, payload, return_body=True)-> dict | int:
+    """Send a POST request to the OZON API
+    Args:
+        session (aiohttp.ClientSession): session with OZON auth and JSON headers
+        url (str): API method url
+        payload (dict): request body
+        return_body (bool): decode and return the JSON response
+
+    Returns:
+        dict | int: decoded JSON response, or the HTTP status if return_body is False
+
+    Raises:
+        ClientResponseError: If the API call fails after all retries.
+        ClientConnectionError: If OZON stays unreachable after all retries.
 
-def get_product_list(last_id, client_id, seller_token)-> dict:
+    Examples:
+         >>> await _post(session, STOCKS_URL, {"stocks": []})
+        {"result": [...]}
+    """
+
+    body = orjson.dumps(payload)
+    semaphore, limiter = _get_limits()
+    for attempt in range(RETRY_ATTEMPTS):
+        last_attempt = attempt == RETRY_ATTEMPTS - 1
+        retry_after = None
+        try:
+            # Сначала квота по частоте, слот занимаем только на сам запрос
+            async with limiter, semaphore:
+                async with session.post(url, data=body) as response:
+                    if response.status not in RETRY_STATUSES or last_attempt:
+                        response.raise_for_status()
+                        if return_body:
+                            return orjson.loads(await response.read())
+                        # Дочитываем ответ без разбора, чтобы соединение вернулось в пул
+                        await response.read()
+                        return response.status
+                    retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if last_attempt:
+                raise
+        # Ждем по нарастающей со случайной добавкой и пробуем еще раз
+        delay = RETRY_BACKOFF * 2 ** attempt + random.random()
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        await asyncio.sleep(delay)
+
+
+async def get_product_list(last_id, session)-> dict:
     """Get a list of ozone store products
     Args:
         last_id (str): last_id in OZON
-        client_id (str): client_id in OZON
-        seller_token (str): seller_token in OZON
+        session (aiohttp.ClientSession): session with OZON auth headers
 
     Returns:
         dict: list of items from the OZON store
 
     Examples:
-          >>> get_product_list("", client_id, seller_token)
+          >>> await get_product_list("", session)
         json file
     """
 
-    url = "https://api-seller.ozon.ru/v2/product/list"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
     payload = {
         "filter": {
             "visibility": "ALL",
@@ -38,85 +152,80 @@ def get_product_list(last_id, client_id, seller_token)-> dict:
         "last_id": last_id,
         "limit": 1000,
     }
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    response_object = response.json()
+    response_object = await _post(session, PRODUCT_LIST_URL, payload)
     return response_object.get("result")
 
 
-def get_offer_ids(client_id, seller_token)-> list:
+async def get_offer_ids(session)-> list:
     """Get article numbers for ozone store products
     Args:
-        client_id (str): client_id in OZON
-        seller_token (str): seller_token in OZON
+        session (aiohttp.ClientSession): session with OZON auth headers
 
     Returns:
         list: R list of items from the OZON store
 
     Examples:
-         >>> get_offer_ids("client_id_55", "seller_token_55")
+         >>> await get_offer_ids(session)
         ['00001', '00002', ...]
     """
 
-    last_id = ""
-    product_list = []
-    while True:
-        some_prod = get_product_list(last_id, client_id, seller_token)
-        product_list.extend(some_prod.get("items"))
-        total = some_prod.get("total")
-        last_id = some_prod.get("last_id")
-        if total == len(product_list):
-            break
     offer_ids = []
-    for product in product_list:
-        offer_ids.append(product.get("offer_id"))
+    next_page = asyncio.create_task(get_product_list("", session))
+    try:
+        while next_page:
+            some_prod = await next_page
+            items = some_prod.get("items")
+            next_page = None
+            if items and len(offer_ids) + len(items) < some_prod.get("total"):
+                # Запрашиваем следующую страницу, пока разбираем текущую
+                next_page = asyncio.create_task(
+                    get_product_list(some_prod.get("last_id"), session)
+                )
+            offer_ids.extend(product.get("offer_id") for product in items)
+    finally:
+        # При ошибке или отмене не оставляем запрос следующей страницы висеть
+        if next_page:
+            next_page.cancel()
     return offer_ids
 
 
-def update_price(prices: list, client_id, seller_token)-> dict:
+async def update_price(prices: list, session, *, return_body=False)-> dict | int:
     """update watch price
     Args:
         prices (str): prices in OZON
-        client_id (str): client_id in OZON
-        seller_token (str): seller_token in OZON
+        session (aiohttp.ClientSession): session with OZON auth headers
+        return_body (bool): return the decoded OZON response instead of the HTTP status
 
     Returns:
-        dict: list of items from the OZON store
+        dict | int: list of items from the OZON store, or the HTTP status
     
     Raises:
-        HTTPError: If the API call fails.        
+        ClientResponseError: If the API call fails.        
 
     Examples:
-         >>> update_price([{'offer_id': '00001', 'Model1': 10}, ...], "client_id_55", "seller_token_55")
+         >>> await update_price([{'offer_id': '00001', 'Model1': 10}, ...], session, return_body=True)
         {"status": "success", "message": "Stocks updated successfully"}
     """
 
-    url = "https://api-seller.ozon.ru/v1/product/import/prices"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
     payload = {"prices": prices}
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return await _post(session, PRICES_URL, payload, return_body)
 
 
-def update_stocks(stocks: list, client_id, seller_token)-> dict:
+async def update_stocks(stocks: list, session, *, return_body=False)-> dict | int:
     """Update balances
     Args:
         stocks (list): list of products to update on the site OZON
-        client_id (str): client_id in OZON
-        seller_token (str): seller_token in OZON
+        session (aiohttp.ClientSession): session with OZON auth headers
+        return_body (bool): return the decoded OZON response instead of the HTTP status
 
     Returns:
-        dict: JSON file
+        dict | int: JSON file, or the HTTP status
 
     Raises:
-        HTTPError: If the API call fails.
+        ClientResponseError: If the API call fails.
 
     Examples:
-         >>> update_stocks("client_id_55", "seller_token_55")
+         >>> await update_stocks([{'offer_id': '00001', 'stock': 100}, ...], session, return_body=True)
           {
                 "auto_action_enabled": "UNKNOWN",
                 "currency_code": "RUB",
@@ -127,82 +236,255 @@ def update_stocks(stocks: list, client_id, seller_token)-> dict:
 
     """
 
-    url = "https://api-seller.ozon.ru/v1/product/import/stocks"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
     payload = {"stocks": stocks}
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return await _post(session, STOCKS_URL, payload, return_body)
+
+
+class Remnants(NamedTuple):
+    """Columns of the remnants table used for OZON, as parallel arrays
+    Args:
+        codes (np.ndarray): article numbers as strings
+        counts (np.ndarray): quantities in the Casio warehouse
+        prices (np.ndarray): prices in the format "xxxx.xx руб"
+    """
 
+    codes: np.ndarray
+    counts: np.ndarray
+    prices: np.ndarray
 
-def download_stock()-> list:
+
+def download_stock()-> pd.DataFrame:
     """Download remnants file from casio website
     Args:
         It doesnt have any args
 
     Returns:
-        list: Returns a list of dictionaries of the remaining warehouses of the Casio store
+        pd.DataFrame: Returns a table of the remaining warehouses of the Casio store
 
     Examples:
          >>> download_stock()
-        [{Model1: 10}, {Model_F: 50}, ...]
+                Код Количество          Цена
+        0     00001        >10  5'990.00 руб.
+        ...
 
     """
 
     # Скачать остатки с сайта
-    casio_url = "https://timeworld.ru/upload/files/ostatki.zip"
-    session = requests.Session()
-    response = session.get(casio_url)
-    response.raise_for_status()
-    with response, zipfile.ZipFile(io.BytesIO(response.content)) as archive:
-        archive.extractall(".")
+    archive_file = io.BytesIO()
+    with _SESSION.get(CASIO_URL, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            archive_file.write(chunk)
+    # Читаем таблицу прямо из архива в памяти, без записи на диск
+    with zipfile.ZipFile(archive_file) as archive:
+        excel_file = io.BytesIO(archive.read("ostatki.xls"))
     # Создаем список остатков часов:
-    excel_file = "ostatki.xls"
     watch_remnants = pd.read_excel(
         io=excel_file,
+        engine=EXCEL_ENGINE,
         na_values=None,
         keep_default_na=False,
         header=17,
-    ).to_dict(orient="records")
-    os.remove("./ostatki.xls")  # Удалить файл
+    )
     return watch_remnants
 
 
+def split_remnants(watch_remnants)-> Remnants:
+    """Keep only the columns OZON needs, as parallel arrays
+    Args:
+        watch_remnants (pd.DataFrame): table of remnants watches.
+
+    Returns:
+        Remnants: article numbers, quantities and prices of the watches
+
+    Examples:
+         >>> split_remnants(download_stock())
+        Remnants(codes=array(['00001', ...]), counts=array(['>10', ...]), prices=array(["5'990.00 руб.", ...]))
+    """
+
+    return Remnants(
+        codes=watch_remnants["Код"].astype(str).to_numpy(),
+        counts=watch_remnants["Количество"].to_numpy(),
+        prices=watch_remnants["Цена"].to_numpy(),
+    )
+
+
+def _first_rows(codes)-> np.ndarray:
+    """Mark the first row of every article number
+    Args:
+        codes (np.ndarray): article numbers
+
+    Returns:
+        np.ndarray: True for the first occurrence of each article
+
+    Examples:
+        >>> _first_rows(np.array(['00001', '00002', '00001']))
+        array([ True,  True, False])
+    """
+
+    first = np.zeros(len(codes), dtype=bool)
+    first[np.unique(codes, return_index=True)[1]] = True
+    return first
+
+
+def _stock_counts(codes, counts)-> np.ndarray:
+    """Convert Casio quantities to OZON stock values
+    Args:
+        codes (np.ndarray): article numbers, used to report unreadable rows
+        counts (np.ndarray): quantities in the Casio warehouse
+
+    Returns:
+        np.ndarray: stock values for OZON
+
+    Examples:
+        >>> _stock_counts(np.array(['00001', '00002', '00003']), np.array(['>10', '1', 2.0]))
+        array([100,   0,   2])
+    """
+
+    as_text = counts.astype(str)
+    more_than_ten = as_text == ">10"
+    numeric = pd.to_numeric(as_text, errors="coerce")
+    unparsed = np.isnan(numeric) & ~more_than_ten
+    if unparsed.any():
+        logger.warning(
+            "Не удалось разобрать количество, остаток будет 0: %s",
+            dict(zip(codes[unparsed].tolist(), counts[unparsed].tolist())),
+        )
+    return np.select(
+        [more_than_ten, as_text == "1"],
+        [100, 0],
+        default=np.nan_to_num(numeric, nan=0).astype(int),
+    )
+
+
+def _price_entry(code, price)-> dict:
+    """Build the OZON price of one watch
+    Args:
+        code (str): article number
+        price (str): price in the format "xxxx.xx руб"
+
+    Returns:
+        dict: price of the watch to update in OZON storage.
+
+    Examples:
+        >>> _price_entry("00001", "5'990.00 руб.")
+        {'auto_action_enabled': 'UNKNOWN', 'currency_code': 'RUB', 'offer_id': '00001', 'old_price': '0', 'price': '5990'}
+    """
+
+    return {
+        "auto_action_enabled": "UNKNOWN",
+        "currency_code": "RUB",
+        "offer_id": code,
+        "old_price": "0",
+        "price": price_conversion(str(price)),
+    }
+
+
+def _match_remnants(watch_remnants, offer_ids)-> tuple:
+    """Keep only the remnants rows whose article is sold in OZON
+    Args:
+        watch_remnants (Remnants): columns of remnants watches.
+        offer_ids (list): list of article numbers.
+
+    Returns:
+        tuple: set of offer_ids and Remnants with the matched rows only
+
+    Examples:
+        >>> remaining, matched = _match_remnants(split_remnants(download_stock()), ['00001', '00002', ...])
+    """
+
+    remaining = set(offer_ids)
+    # Поиск по множеству: для массивов объектов np.isin сравнивает каждый с каждым
+    matched = np.fromiter(
+        (code in remaining for code in watch_remnants.codes),
+        dtype=bool,
+        count=len(watch_remnants.codes),
+    )
+    return remaining, Remnants(*(column[matched] for column in watch_remnants))
+
+
+def _iter_stocks(remaining, matched):
+    """Yield remnants to update in OZON from the matched rows
+    Args:
+        remaining (set): all article numbers in OZON
+        matched (Remnants): remnants rows with articles sold in OZON
+
+    Yields:
+        dict: remnant of one watch to update in OZON storage.
+
+    Examples:
+        >>> next(_iter_stocks(*_match_remnants(watch_remnants, offer_ids)))
+        {'offer_id': '00001', 'stock': 100}
+    """
+
+    # Остаток берем по первой строке артикула
+    first = _first_rows(matched.codes)
+    codes = matched.codes[first]
+    stock = _stock_counts(codes, matched.counts[first])
+    for code, count in zip(codes, stock):
+        yield {"offer_id": code, "stock": int(count)}
+    # Добавим недостающее из загруженного:
+    for offer_id in remaining.difference(codes):
+        yield {"offer_id": offer_id, "stock": 0}
+
+
+def _iter_prices(matched):
+    """Yield prices to update in OZON from the matched rows
+    Args:
+        matched (Remnants): remnants rows with articles sold in OZON
+
+    Yields:
+        dict: price of one watch to update in OZON storage.
+
+    Examples:
+        >>> next(_iter_prices(_match_remnants(watch_remnants, offer_ids)[1]))
+        {'offer_id': '00001', 'price': '5990', ...}
+    """
+
+    # Цену берем по каждой строке артикула
+    for code, price in zip(matched.codes, matched.prices):
+        yield _price_entry(code, price)
+
+
+def build_stocks_and_prices(watch_remnants, offer_ids)-> tuple:
+    """
+    This function matches remnants with OZON articles once and streams stocks and prices
+
+    Args:
+        watch_remnants (Remnants): columns of remnants watches.
+        offer_ids (list): list of article numbers.
+
+    Returns:
+        tuple: two generators, of remnants and of prices to update in OZON storage.
+
+    Examples:
+        >>> stocks, prices = build_stocks_and_prices(split_remnants(download_stock()), ['00001', '00002', ...])
+        >>> next(stocks), next(prices)
+        ({'offer_id': '00001', 'stock': 100}, {'offer_id': '00001', 'price': '5990', ...})
+    """
+
+    remaining, matched = _match_remnants(watch_remnants, offer_ids)
+    return _iter_stocks(remaining, matched), _iter_prices(matched)
+
+
 def create_stocks(watch_remnants, offer_ids)-> list:
     """
     The function creates a list of products to update on the site OZON
 
     Args:
-        watch_remnants (list): list of remnants watches.
+        watch_remnants (Remnants): columns of remnants watches.
         offer_ids (list): list of article numbers.
 
     Returns:
         list: list of remnants watches to update in OZON storage.
 
     Examples:
-        >>> create_stocks([{Model1: 10}, {Model_F: 50}, ...], ['00001', '00002', ...])
-        [{'offer_id': '00001', 'Model1': 10}, ...]
+        >>> create_stocks(split_remnants(download_stock()), ['00001', '00002', ...])
+        [{'offer_id': '00001', 'stock': 100}, ...]
     """
 
-    stocks = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append({"offer_id": str(watch.get("Код")), "stock": stock})
-            offer_ids.remove(str(watch.get("Код")))
-    # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
-        stocks.append({"offer_id": offer_id, "stock": 0})
-    return stocks
+    remaining, matched = _match_remnants(watch_remnants, offer_ids)
+    return list(_iter_stocks(remaining, matched))
 
 
 def create_prices(watch_remnants, offer_ids)-> list:
@@ -210,14 +492,14 @@ def create_prices(watch_remnants, offer_ids)-> list:
     This function create list of prices to upload on the site OZON
 
     Args:
-        watch_remnants (list): list of remnants watches.
+        watch_remnants (Remnants): columns of remnants watches.
         offer_ids (list): list of article numbers.
 
     Returns:
         list: list of prices watches to update in OZON storage.
 
     Examples:
-        >>> create_stocks([{Model1: 10}, {Model_F: 50}, ...], ['00001', '00002', ...])
+        >>> create_prices(split_remnants(download_stock()), ['00001', '00002', ...])
         [
         {
                 "auto_action_enabled": "UNKNOWN",
@@ -228,19 +510,9 @@ def create_prices(watch_remnants, offer_ids)-> list:
             }, ...
             ]
     """
-    
-    prices = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            price = {
-                "auto_action_enabled": "UNKNOWN",
-                "currency_code": "RUB",
-                "offer_id": str(watch.get("Код")),
-                "old_price": "0",
-                "price": price_conversion(watch.get("Цена")),
-            }
-            prices.append(price)
-    return prices
+
+    _, matched = _match_remnants(watch_remnants, offer_ids)
+    return list(_iter_prices(matched))
 
 
 def price_conversion(price: str) -> str:
@@ -266,92 +538,144 @@ def price_conversion(price: str) -> str:
         xxxx.xx руб
     """
 
-    return re.sub("[^0-9]", "", price.split(".")[0])
+    return _NON_DIGITS.sub("", price.split(".", 1)[0])
 
 
-def divide(lst: list, n: int) -> list:
+def divide(lst, n: int) -> list:
     """Split list lst into parts of n elements
     Args:
-        lst (list): [{'offer_id': '00001', 'Model1': 10}, ...]
+        lst (iterable): [{'offer_id': '00001', 'Model1': 10}, ...]
         n (int): 10
     Returns:
         list: list of remnants watches to update in OZON storage.
 
     Examples:
-        >>> create_stocks([{Model1: 10}, {Model_F: 50}, ...], ['00001', '00002', ...])
-        [[0, 9], [1, 10], ...]
+        >>> list(divide(range(20), 10))
+        [[0, ..., 9], [10, ..., 19]]
+    """
+
+    # В памяти одновременно только одна часть, lst может быть генератором
+    items = iter(lst)
+    while some_items := list(islice(items, n)):
+        yield some_items
+
+
+async def _upload_batches(update, batches, session)-> None:
+    """Send batches to OZON through a bounded queue
+    Args:
+        update (function): update_price or update_stocks
+        batches (iterable): parts of the list to upload
+        session (aiohttp.ClientSession): session with OZON auth headers
+
+    Raises:
+        ClientResponseError: If any API call fails.
+
+    Examples:
+        >>> await _upload_batches(update_stocks, divide(stocks, STOCKS_BATCH_SIZE), session)
     """
 
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
+    # Очередь ограничена, чтобы не готовить части быстрее, чем они уходят
+    queue = asyncio.Queue(maxsize=UPLOAD_WORKERS)
+
+    async def produce():
+        for batch in batches:
+            await queue.put(batch)
+            # Отдаем управление, чтобы часть ушла, пока готовится следующая
+            await asyncio.sleep(0)
+        for _ in range(UPLOAD_WORKERS):
+            await queue.put(None)
+
+    async def consume():
+        while (batch := await queue.get()) is not None:
+            await update(batch, session)
+
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(consume()) for _ in range(UPLOAD_WORKERS))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
-async def upload_prices(watch_remnants, client_id, seller_token)-> list:
+async def upload_prices(watch_remnants, offer_ids, session)-> list:
     """upload_prices in OZON STORE
     Args:
-        watch_remnants (list): list of remnants watches.
-        client_id (str):  client_id in OZON
-        seller_token (str): The seller token for authentication.
+        watch_remnants (Remnants): columns of remnants watches.
+        offer_ids (list): list of article numbers.
+        session (aiohttp.ClientSession): session with OZON auth headers
 
     Returns:
         list: A list of prices.
 
     Example:
-        >>> upload_prices(watch_remnants, "client123", "token123")
+        >>> await upload_prices(watch_remnants, offer_ids, session)
 
     """
 
-    offer_ids = get_offer_ids(client_id, seller_token)
     prices = create_prices(watch_remnants, offer_ids)
-    for some_price in list(divide(prices, 1000)):
-        update_price(some_price, client_id, seller_token)
+    await _upload_batches(update_price, divide(prices, PRICES_BATCH_SIZE), session)
     return prices
 
 
-async def upload_stocks(watch_remnants, client_id, seller_token)-> tuple:
+async def upload_stocks(watch_remnants, offer_ids, session)-> tuple:
     """Split list lst into parts of n elements
     Args:
-        watch_remnants (list): list of remnants watches.
-        client_id (str): client_id in OZON
-        seller_token (str): seller_token in OZON
+        watch_remnants (Remnants): columns of remnants watches.
+        offer_ids (list): list of article numbers.
+        session (aiohttp.ClientSession): session with OZON auth headers
     Returns:
         tuple: two lists with items in stock and with all items.
 
     Examples:
-        >>> upload_stocks([{'Model1': 10}, ...],  [{'Model10': 0}, ...], client_id, seller_token)
+        >>> await upload_stocks(split_remnants(download_stock()), ['00001', '00002', ...], session)
         
     """
 
-    offer_ids = get_offer_ids(client_id, seller_token)
     stocks = create_stocks(watch_remnants, offer_ids)
-    for some_stock in list(divide(stocks, 100)):
-        update_stocks(some_stock, client_id, seller_token)
+    await _upload_batches(update_stocks, divide(stocks, STOCKS_BATCH_SIZE), session)
     not_empty = list(filter(lambda stock: (stock.get("stock") != 0), stocks))
     return not_empty, stocks
 
 
-def main():
+async def main():
     env = Env()
     seller_token = env.str("SELLER_TOKEN")
     client_id = env.str("CLIENT_ID")
-    try:
-        offer_ids = get_offer_ids(client_id, seller_token)
-        watch_remnants = download_stock()
-        # Обновить остатки
-        stocks = create_stocks(watch_remnants, offer_ids)
-        for some_stock in list(divide(stocks, 100)):
-            update_stocks(some_stock, client_id, seller_token)
-        # Поменять цены
-        prices = create_prices(watch_remnants, offer_ids)
-        for some_price in list(divide(prices, 900)):
-            update_price(some_price, client_id, seller_token)
-    except requests.exceptions.ReadTimeout:
-        print("Превышено время ожидания...")
-    except requests.exceptions.ConnectionError as error:
-        print(error, "Ошибка соединения")
-    except Exception as error:
-        print(error, "ERROR_2")
+    # Заголовки задаются один раз для всей сессии; тело сериализуем сами через orjson
+    headers = {
+        "Client-Id": client_id,
+        "Api-Key": seller_token,
+        "Content-Type": "application/json",
+    }
+    connector = aiohttp.TCPConnector(limit_per_host=64, keepalive_timeout=60)
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        try:
+            # Артикулы и остатки не зависят друг от друга: загружаем одновременно
+            tasks = [
+                asyncio.create_task(get_offer_ids(session)),
+                asyncio.create_task(asyncio.to_thread(download_stock)),
+            ]
+            try:
+                offer_ids, remnants_table = await asyncio.gather(*tasks)
+            finally:
+                # Если одна загрузка упала, вторую останавливаем до закрытия сессии
+                for task in tasks:
+                    task.cancel()
+            watch_remnants = split_remnants(remnants_table)
+            # Записи строятся лениво, по мере того как части уходят в OZON
+            stocks, prices = build_stocks_and_prices(watch_remnants, offer_ids)
+            # Обновить остатки
+            await _upload_batches(update_stocks, divide(stocks, STOCKS_BATCH_SIZE), session)
+            # Поменять цены
+            await _upload_batches(update_price, divide(prices, PRICES_BATCH_SIZE), session)
+        except (requests.exceptions.ReadTimeout, asyncio.TimeoutError):
+            print("Превышено время ожидания...")
+        except (requests.exceptions.ConnectionError, aiohttp.ClientConnectionError) as error:
+            print(error, "Ошибка соединения")
+        except Exception as error:
+            print(error, "ERROR_2")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())